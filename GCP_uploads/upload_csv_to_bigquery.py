@@ -13,17 +13,63 @@ Usage:
 """
 
 import argparse
+import gzip
 import os
+import shutil
 import sys
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 
-import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
 from google.cloud import bigquery
 from google.cloud.exceptions import NotFound
 from google.api_core import exceptions
 
 
+# Predefined schemas for known tables, built once at import time so they are
+# not reconstructed on every get_predefined_schema call. Keys are already
+# lowercase (lookups normalize with .lower()) and the proxy keeps the mapping
+# immutable so no caller can mutate the shared schema lists' container.
+_PREDEFINED_SCHEMAS = types.MappingProxyType({
+    "warehouse_movements": [
+        bigquery.SchemaField("movement_date", "DATE"),
+        bigquery.SchemaField("warehouse_origin", "STRING"),
+        bigquery.SchemaField("warehouse_destination", "STRING"),
+        bigquery.SchemaField("item_id", "INTEGER"),
+        bigquery.SchemaField("item_name", "STRING"),
+        bigquery.SchemaField("quantity", "INTEGER"),
+    ],
+    "inventory": [
+        bigquery.SchemaField("item_id", "INTEGER"),
+        bigquery.SchemaField("item_name", "STRING"),
+        bigquery.SchemaField("warehouse", "STRING"),
+        bigquery.SchemaField("quantity", "INTEGER"),
+        bigquery.SchemaField("last_updated", "TIMESTAMP"),
+    ],
+    "sales": [
+        bigquery.SchemaField("sale_date", "DATE"),
+        bigquery.SchemaField("item_id", "INTEGER"),
+        bigquery.SchemaField("item_name", "STRING"),
+        bigquery.SchemaField("quantity", "INTEGER"),
+        bigquery.SchemaField("unit_price", "FLOAT"),
+        bigquery.SchemaField("total_amount", "FLOAT"),
+    ],
+    "purchases": [
+        bigquery.SchemaField("purchase_date", "DATE"),
+        bigquery.SchemaField("item_id", "INTEGER"),
+        bigquery.SchemaField("item_name", "STRING"),
+        bigquery.SchemaField("quantity", "INTEGER"),
+        bigquery.SchemaField("unit_cost", "FLOAT"),
+        bigquery.SchemaField("total_cost", "FLOAT"),
+        bigquery.SchemaField("supplier", "STRING"),
+    ]
+})
+
+
 class BigQueryCSVUploader:
     """Class to handle CSV uploads to BigQuery."""
     
@@ -45,6 +91,15 @@ class BigQueryCSVUploader:
         except Exception as e:
             print(f"Error initializing BigQuery client: {e}")
             sys.exit(1)
+        
+        # Short-lived cache of get_table_info results, keyed by table ID, so
+        # summaries issued right after an upload don't repeat the RPC
+        self._table_cache: Dict[str, Any] = {}
+        self._table_cache_ttl = 30.0  # seconds
+        
+        # Datasets already confirmed (or created) this run, so repeated
+        # uploads into the same dataset skip the get_dataset round-trip
+        self._known_datasets: set = set()
     
     def create_dataset_if_not_exists(self, dataset_id: str, location: str = "US") -> None:
         """
@@ -54,6 +109,9 @@ class BigQueryCSVUploader:
             dataset_id: The dataset ID (not the full dataset reference).
             location: The location for the dataset.
         """
+        if dataset_id in self._known_datasets:
+            return
+        
         dataset_ref = f"{self.project_id}.{dataset_id}"
         
         try:
@@ -64,37 +122,46 @@ class BigQueryCSVUploader:
             dataset.location = location
             dataset = self.client.create_dataset(dataset)
             print(f"Created dataset {dataset_ref}")
+        
+        self._known_datasets.add(dataset_id)
     
-    def infer_schema_from_csv(self, csv_file: str, sample_size: int = 1000) -> List[bigquery.SchemaField]:
+    def infer_schema_from_csv(self, csv_file: str, block_size: int = 1 << 20) -> List[bigquery.SchemaField]:
         """
         Infer BigQuery schema from CSV file.
-        
+
+        Uses pyarrow's streaming CSV reader, which infers types from the first
+        block in C++ without parsing the whole file.
+
         Args:
             csv_file: Path to the CSV file.
-            sample_size: Number of rows to sample for schema inference.
-        
+            block_size: Number of bytes to read for schema inference.
+
         Returns:
             List of BigQuery schema fields.
         """
         try:
-            # Read a sample of the CSV to infer types
-            df_sample = pd.read_csv(csv_file, nrows=sample_size)
-            
+            # Read a single block of the CSV to infer types
+            reader = pa_csv.open_csv(
+                csv_file, read_options=pa_csv.ReadOptions(block_size=block_size)
+            )
+            arrow_schema = reader.schema
+            reader.close()
+
             schema = []
-            for column, dtype in df_sample.dtypes.items():
-                if pd.api.types.is_integer_dtype(dtype):
+            for field in arrow_schema:
+                if pa.types.is_integer(field.type):
                     field_type = "INTEGER"
-                elif pd.api.types.is_float_dtype(dtype):
+                elif pa.types.is_floating(field.type):
                     field_type = "FLOAT"
-                elif pd.api.types.is_bool_dtype(dtype):
+                elif pa.types.is_boolean(field.type):
                     field_type = "BOOLEAN"
-                elif pd.api.types.is_datetime64_any_dtype(dtype):
+                elif pa.types.is_timestamp(field.type) or pa.types.is_date(field.type):
                     field_type = "TIMESTAMP"
                 else:
                     field_type = "STRING"
-                
-                schema.append(bigquery.SchemaField(column, field_type))
-            
+
+                schema.append(bigquery.SchemaField(field.name, field_type))
+
             return schema
         except Exception as e:
             print(f"Error inferring schema: {e}")
@@ -110,42 +177,7 @@ class BigQueryCSVUploader:
         Returns:
             List of BigQuery schema fields or None if no predefined schema exists.
         """
-        schemas = {
-            "warehouse_movements": [
-                bigquery.SchemaField("movement_date", "DATE"),
-                bigquery.SchemaField("warehouse_origin", "STRING"),
-                bigquery.SchemaField("warehouse_destination", "STRING"),
-                bigquery.SchemaField("item_id", "INTEGER"),
-                bigquery.SchemaField("item_name", "STRING"),
-                bigquery.SchemaField("quantity", "INTEGER"),
-            ],
-            "inventory": [
-                bigquery.SchemaField("item_id", "INTEGER"),
-                bigquery.SchemaField("item_name", "STRING"),
-                bigquery.SchemaField("warehouse", "STRING"),
-                bigquery.SchemaField("quantity", "INTEGER"),
-                bigquery.SchemaField("last_updated", "TIMESTAMP"),
-            ],
-            "sales": [
-                bigquery.SchemaField("sale_date", "DATE"),
-                bigquery.SchemaField("item_id", "INTEGER"),
-                bigquery.SchemaField("item_name", "STRING"),
-                bigquery.SchemaField("quantity", "INTEGER"),
-                bigquery.SchemaField("unit_price", "FLOAT"),
-                bigquery.SchemaField("total_amount", "FLOAT"),
-            ],
-            "purchases": [
-                bigquery.SchemaField("purchase_date", "DATE"),
-                bigquery.SchemaField("item_id", "INTEGER"),
-                bigquery.SchemaField("item_name", "STRING"),
-                bigquery.SchemaField("quantity", "INTEGER"),
-                bigquery.SchemaField("unit_cost", "FLOAT"),
-                bigquery.SchemaField("total_cost", "FLOAT"),
-                bigquery.SchemaField("supplier", "STRING"),
-            ]
-        }
-        
-        return schemas.get(table_name.lower())
+        return _PREDEFINED_SCHEMAS.get(table_name.lower())
     
     def upload_csv_to_table(
         self,
@@ -156,13 +188,21 @@ class BigQueryCSVUploader:
         auto_detect_schema: bool = True,
         skip_leading_rows: int = 1,
         field_delimiter: str = ",",
-        encoding: str = "UTF-8"
-    ) -> bool:
+        encoding: str = "UTF-8",
+        gcs_staging_bucket: Optional[str] = None,
+        compress: bool = True,
+        parallel_chunks: int = 1,
+        skip_dataset_check: bool = False
+    ) -> Dict[str, Any]:
         """
-        Upload a CSV file to a BigQuery table.
+        Upload a CSV (or Parquet) file to a BigQuery table.
+        
+        Files ending in ".parquet" are loaded as Parquet: they carry their own
+        schema, so inference, CSV parsing options and gzip compression are all
+        skipped for them.
         
         Args:
-            csv_file: Path to the CSV file.
+            csv_file: Path to the CSV or Parquet file.
             table_id: Full table ID (project.dataset.table).
             write_disposition: How to handle existing data (WRITE_APPEND, WRITE_TRUNCATE, WRITE_EMPTY).
             schema: Optional schema. If None, will try to infer or use predefined schema.
@@ -170,79 +210,229 @@ class BigQueryCSVUploader:
             skip_leading_rows: Number of header rows to skip.
             field_delimiter: CSV field delimiter.
             encoding: File encoding.
+            gcs_staging_bucket: Optional GCS bucket name. When set, the CSV is
+                staged to GCS in 8 MiB resumable chunks and loaded with
+                load_table_from_uri, so BigQuery pulls the data from GCS
+                instead of a single client-side media upload.
+            compress: Gzip the CSV before uploading. BigQuery ingests gzipped
+                CSV natively, so this trades a little CPU for a 5-10x cut in
+                upload bytes. Disable on fast LAN/GCE paths.
+            parallel_chunks: When > 1, split the CSV at line boundaries into
+                this many pieces and load them as concurrent jobs, spreading
+                the upload over multiple HTTP streams and BigQuery ingest
+                workers. Compression is skipped on this path. Useful for
+                files larger than ~100 MB.
+            skip_dataset_check: Skip the dataset existence check entirely;
+                for callers that already verified the dataset once up front.
         
         Returns:
-            True if successful, False otherwise.
+            Dictionary with "success", "num_rows" and "num_bytes" keys.
+            "num_rows"/"num_bytes" reflect what this load job wrote and are
+            None when the upload failed.
         """
+        failure = {"success": False, "num_rows": None, "num_bytes": None}
+        temp_gz = None
         try:
             # Validate file exists
             if not Path(csv_file).exists():
                 print(f"Error: File {csv_file} does not exist.")
-                return False
+                return failure
             
             # Parse table ID
             parts = table_id.split('.')
             if len(parts) != 3:
                 print(f"Error: Table ID must be in format 'project.dataset.table', got: {table_id}")
-                return False
+                return failure
             
             project_id, dataset_id, table_name = parts
             
             # Create dataset if it doesn't exist
-            self.create_dataset_if_not_exists(dataset_id)
+            if not skip_dataset_check:
+                self.create_dataset_if_not_exists(dataset_id)
             
             # Get table reference
             table_ref = self.client.dataset(dataset_id, project=project_id).table(table_name)
             
-            # Determine schema
-            if schema is None:
-                # Try predefined schema first
-                schema = self.get_predefined_schema(table_name)
-                if schema is None and not auto_detect_schema:
-                    # Infer schema from CSV
-                    schema = self.infer_schema_from_csv(csv_file)
-                    if not schema:
-                        print("Error: Could not determine schema for the table.")
-                        return False
+            is_parquet = csv_file.endswith(".parquet")
+            
+            # Determine schema (Parquet files embed theirs). When
+            # auto_detect_schema is set, skip client-side resolution entirely
+            # and let BigQuery detect the schema server-side; the predefined/
+            # inferred schemas only matter when autodetection is off.
+            if schema is None and not is_parquet and not auto_detect_schema:
+                schema = self.get_predefined_schema(table_name) or self.infer_schema_from_csv(csv_file)
+                if not schema:
+                    print("Error: Could not determine schema for the table.")
+                    return failure
             
             # Configure job
-            job_config = bigquery.LoadJobConfig(
-                source_format=bigquery.SourceFormat.CSV,
-                skip_leading_rows=skip_leading_rows,
-                field_delimiter=field_delimiter,
-                encoding=encoding,
-                write_disposition=write_disposition,
-                autodetect=auto_detect_schema and schema is None,
-                schema=schema if schema else None,
-            )
+            if is_parquet:
+                job_config = bigquery.LoadJobConfig(
+                    source_format=bigquery.SourceFormat.PARQUET,
+                    write_disposition=write_disposition,
+                )
+            else:
+                job_config = bigquery.LoadJobConfig(
+                    source_format=bigquery.SourceFormat.CSV,
+                    skip_leading_rows=skip_leading_rows,
+                    field_delimiter=field_delimiter,
+                    encoding=encoding,
+                    write_disposition=write_disposition,
+                    autodetect=schema is None,
+                    schema=schema if schema else None,
+                )
+            
+            # Parallel chunked load: split the file and run one load job per
+            # chunk. The first chunk keeps the caller's write disposition (so
+            # WRITE_TRUNCATE still resets the table exactly once) and the
+            # remaining chunks append concurrently.
+            if parallel_chunks > 1 and not is_parquet and not csv_file.endswith(".gz"):
+                print(f"Uploading {csv_file} to {table_id} in {parallel_chunks} parallel chunks...")
+                chunk_paths = self._split_csv_file(csv_file, parallel_chunks)
+                try:
+                    append_config = bigquery.LoadJobConfig(
+                        source_format=bigquery.SourceFormat.CSV,
+                        skip_leading_rows=skip_leading_rows,
+                        field_delimiter=field_delimiter,
+                        encoding=encoding,
+                        write_disposition="WRITE_APPEND",
+                        autodetect=job_config.autodetect,
+                        schema=job_config.schema,
+                    )
+                    
+                    def _load_chunk(path, config):
+                        with open(path, "rb") as chunk_file:
+                            chunk_job = self.client.load_table_from_file(
+                                chunk_file, table_ref, job_config=config
+                            )
+                        return chunk_job.result()
+                    
+                    # Coordination job: first chunk with the original disposition
+                    chunk_jobs = [_load_chunk(chunk_paths[0], job_config)]
+                    with ThreadPoolExecutor(max_workers=min(8, parallel_chunks)) as executor:
+                        chunk_jobs.extend(executor.map(
+                            lambda path: _load_chunk(path, append_config), chunk_paths[1:]
+                        ))
+                finally:
+                    for path in chunk_paths:
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                
+                num_rows = sum(chunk_job.output_rows for chunk_job in chunk_jobs)
+                num_bytes = sum(chunk_job.output_bytes for chunk_job in chunk_jobs)
+                print(f"Successfully uploaded {num_rows} rows to {table_id}")
+                self._table_cache.pop(table_id, None)
+                return {
+                    "success": True,
+                    "num_rows": num_rows,
+                    "num_bytes": num_bytes,
+                }
+            
+            # Optionally gzip the CSV first; compresslevel=1 keeps the CPU
+            # cost small while the bandwidth reduction does the heavy lifting.
+            # Parquet is already compressed, so it is sent as-is.
+            upload_file = csv_file
+            if compress and not is_parquet and not csv_file.endswith(".gz"):
+                temp_gz = csv_file + ".gz"
+                with open(csv_file, "rb") as src, gzip.open(temp_gz, "wb", compresslevel=1) as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+                upload_file = temp_gz
             
             # Upload file
-            print(f"Uploading {csv_file} to {table_id}...")
+            print(f"Uploading {upload_file} to {table_id}...")
             print(f"Write disposition: {write_disposition}")
             
-            with open(csv_file, "rb") as source_file:
-                job = self.client.load_table_from_file(
-                    source_file, table_ref, job_config=job_config
+            if gcs_staging_bucket:
+                # Stage the file in GCS with chunked resumable upload, then
+                # let BigQuery load it straight from the bucket
+                from google.cloud import storage
+                
+                storage_client = storage.Client(project=self.project_id)
+                bucket = storage_client.bucket(gcs_staging_bucket)
+                blob_name = f"bq_staging/{Path(upload_file).name}"
+                blob = bucket.blob(blob_name, chunk_size=8 * 1024 * 1024)
+                print(f"Staging {upload_file} to gs://{gcs_staging_bucket}/{blob_name}...")
+                blob.upload_from_filename(upload_file)
+                
+                job = self.client.load_table_from_uri(
+                    f"gs://{gcs_staging_bucket}/{blob_name}", table_ref, job_config=job_config
                 )
+            else:
+                with open(upload_file, "rb") as source_file:
+                    job = self.client.load_table_from_file(
+                        source_file, table_ref, job_config=job_config
+                    )
             
             # Wait for job to complete
             job.result()  # Waits for the job to complete
             
-            # Get table info
-            table = self.client.get_table(table_ref)
-            print(f"Successfully uploaded {table.num_rows} rows to {table_id}")
+            # The finished job already reports what it loaded; no extra
+            # get_table round-trip needed
+            print(f"Successfully uploaded {job.output_rows} rows to {table_id}")
             
-            return True
+            # Drop any cached info for this table so later lookups don't
+            # return pre-load row counts
+            self._table_cache.pop(table_id, None)
+            
+            return {
+                "success": True,
+                "num_rows": job.output_rows,
+                "num_bytes": job.output_bytes,
+            }
             
         except exceptions.BadRequest as e:
             print(f"Bad request error: {e}")
             if hasattr(e, 'errors'):
                 for error in e.errors:
                     print(f"  - {error}")
-            return False
+            return failure
         except Exception as e:
             print(f"Error uploading CSV to BigQuery: {e}")
-            return False
+            return failure
+        finally:
+            # Clean up the temporary gzipped copy
+            if temp_gz:
+                try:
+                    os.remove(temp_gz)
+                except OSError:
+                    pass
+    
+    def _split_csv_file(self, csv_file: str, num_chunks: int) -> List[str]:
+        """
+        Split a CSV into temporary files at line boundaries.
+        
+        The header line is repeated at the top of every chunk so each piece
+        is a loadable CSV on its own.
+        
+        Args:
+            csv_file: Path to the source CSV.
+            num_chunks: Number of pieces to produce (the last one absorbs any
+                remainder).
+        
+        Returns:
+            List of chunk file paths; the caller removes them after loading.
+        """
+        chunk_paths = []
+        target_size = max(1, os.path.getsize(csv_file) // num_chunks)
+        
+        with open(csv_file, "rb") as src:
+            header = src.readline()
+            for i in range(num_chunks):
+                path = f"{csv_file}.chunk{i}"
+                written = 0
+                with open(path, "wb") as dst:
+                    dst.write(header)
+                    while written < target_size or i == num_chunks - 1:
+                        line = src.readline()
+                        if not line:
+                            break
+                        dst.write(line)
+                        written += len(line)
+                chunk_paths.append(path)
+        
+        return chunk_paths
     
     def list_tables_in_dataset(self, dataset_id: str) -> List[str]:
         """
@@ -272,15 +462,23 @@ class BigQueryCSVUploader:
         Returns:
             Dictionary with table information or None if table doesn't exist.
         """
+        cached = self._table_cache.get(table_id)
+        if cached is not None:
+            cached_at, info = cached
+            if time.monotonic() - cached_at < self._table_cache_ttl:
+                return info
+        
         try:
             table = self.client.get_table(table_id)
-            return {
+            info = {
                 "num_rows": table.num_rows,
                 "num_bytes": table.num_bytes,
                 "created": table.created,
                 "modified": table.modified,
                 "schema": [{"name": field.name, "type": field.field_type} for field in table.schema]
             }
+            self._table_cache[table_id] = (time.monotonic(), info)
+            return info
         except NotFound:
             print(f"Table {table_id} not found.")
             return None
@@ -308,6 +506,12 @@ def main():
                        help="CSV field delimiter (default: ,)")
     parser.add_argument("--encoding", default="UTF-8",
                        help="File encoding (default: UTF-8)")
+    parser.add_argument("--gcs_staging_bucket",
+                       help="Stage the CSV in this GCS bucket and load from there")
+    parser.add_argument("--no_compress", action="store_true",
+                       help="Upload the CSV uncompressed instead of gzipped")
+    parser.add_argument("--parallel_chunks", type=int, default=1,
+                       help="Split the CSV and load this many chunks concurrently (default: 1)")
     parser.add_argument("--list_tables", help="List tables in dataset")
     parser.add_argument("--table_info", help="Get information about a table")
     
@@ -341,23 +545,22 @@ def main():
         return
     
     # Upload CSV
-    success = uploader.upload_csv_to_table(
+    result = uploader.upload_csv_to_table(
         csv_file=args.csv_file,
         table_id=args.table_id,
         write_disposition=args.write_disposition,
         auto_detect_schema=args.auto_detect_schema,
         skip_leading_rows=args.skip_leading_rows,
         field_delimiter=args.field_delimiter,
-        encoding=args.encoding
+        encoding=args.encoding,
+        gcs_staging_bucket=args.gcs_staging_bucket,
+        compress=not args.no_compress,
+        parallel_chunks=args.parallel_chunks
     )
     
-    if success:
+    if result["success"]:
         print("CSV upload completed successfully!")
-        
-        # Show table info after upload
-        info = uploader.get_table_info(args.table_id)
-        if info:
-            print(f"\nTable now contains {info['num_rows']:,} rows")
+        print(f"\nLoaded {result['num_rows']:,} rows into the table")
     else:
         print("CSV upload failed!")
         sys.exit(1)
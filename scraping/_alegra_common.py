@@ -0,0 +1,364 @@
+"""
+Shared Alegra API Pagination Machinery
+
+The movements, purchases, and sales downloaders all page through an Alegra
+endpoint the same way. This module holds the single copy of the concurrent
+fetch loop, retry and cache handling, and the batched CSV writer; each
+script supplies its endpoint, its process_*_data function, and its output
+filename via paginate_and_save.
+
+Author: Your Name
+Date: August 2025
+"""
+
+import asyncio
+import csv
+import hashlib
+import os
+import shelve
+import sys
+import time
+import aiohttp
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import List, Dict, Any, Callable, Optional
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Configuration constants
+API_BASE_URL = "https://api.alegra.com/api/v1"
+BATCH_SIZE = 30  # Number of records to fetch per request
+CONCURRENCY = 16  # Concurrent page requests per wave
+MAX_RETRIES = 5  # Attempts per page for rate-limited or transient errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(sock_connect=5, total=30)
+FLUSH_EVERY_PAGES = 20  # Pages buffered in memory between CSV writes
+CACHE_FILE = "alegra_cache"  # On-disk response cache shared by repeated runs
+CACHE_TTL_SECONDS = 6 * 60 * 60
+USE_CACHE = "--no-cache" not in sys.argv
+
+# API credentials from environment variable
+AUTHORIZATION_TOKEN = os.getenv("KEY_ALEGRA")
+if not AUTHORIZATION_TOKEN:
+    raise ValueError("KEY_ALEGRA environment variable is not set")
+
+# Constant request headers, built once instead of per page
+HEADERS = {
+    "accept": "application/json",
+    "authorization": AUTHORIZATION_TOKEN
+}
+
+
+def _cache_key(url: str, params: Dict[str, str]) -> str:
+    """Stable cache key for one endpoint + query-parameter combination."""
+    return hashlib.sha1(f"{url}|{sorted(params.items())}".encode()).hexdigest()
+
+
+async def _fetch_page(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    url: str,
+    params: Dict[str, str],
+    cache: "shelve.Shelf" = None
+) -> List[Dict[str, Any]]:
+    """
+    Fetch a single page of records, limited by the shared semaphore.
+
+    Args:
+        session (aiohttp.ClientSession): Shared HTTP session with pooled
+            connections and the constant request headers already attached
+        semaphore (asyncio.Semaphore): Caps the number of in-flight requests
+        url (str): API endpoint URL
+        params (Dict[str, str]): Query parameters including the pagination offset
+        cache (shelve.Shelf, optional): On-disk response cache; fresh entries
+            are returned without touching the network
+
+    Returns:
+        List[Dict[str, Any]]: Raw records returned for this page
+    """
+    # Serve repeated runs (and resumed runs) from the on-disk cache so
+    # unchanged pages cost no API quota at all
+    key = _cache_key(url, params) if cache is not None else None
+    if cache is not None:
+        entry = cache.get(key)
+        if entry is not None:
+            cached_at, data = entry
+            if time.time() - cached_at < CACHE_TTL_SECONDS:
+                return data
+
+    async with semaphore:
+        for attempt in range(MAX_RETRIES):
+            async with session.get(url, params=params) as response:
+                if response.status in RETRY_STATUS_CODES and attempt < MAX_RETRIES - 1:
+                    # Back off exponentially on rate limits and transient
+                    # server errors, reusing the pooled connection
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+                    continue
+                response.raise_for_status()
+                # orjson parses the raw bytes directly, skipping aiohttp's
+                # charset handling and the slower stdlib json decoder
+                data = orjson.loads(await response.read())
+                if cache is not None:
+                    cache[key] = (time.time(), data)
+                return data
+
+
+def save_batch_to_parquet(data: List[Dict[str, Any]], writer: Optional[pq.ParquetWriter], filename: str) -> pq.ParquetWriter:
+    """
+    Append a processed batch to a Parquet file through a long-lived writer.
+
+    Args:
+        data (List[Dict[str, Any]]): Processed rows for this batch
+        writer (Optional[pq.ParquetWriter]): Existing writer, or None on the
+            first batch; the writer is then created from this batch's schema
+        filename (str): Output Parquet filename
+
+    Returns:
+        pq.ParquetWriter: The writer to reuse for subsequent batches; the
+        caller is responsible for closing it after the last batch
+    """
+    try:
+        if writer is None:
+            # The writer's schema is fixed for the life of the file, so it
+            # must not be dictated by what the first flush happens to
+            # contain: a field that is all-None there is inferred as the
+            # null type and would reject real values on every later flush.
+            # Promote such fields to string before capturing the schema.
+            inferred = pa.Table.from_pylist(data).schema
+            schema = pa.schema([
+                pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+                for field in inferred
+            ])
+            writer = pq.ParquetWriter(filename, schema, compression="snappy")
+        # Build every batch against the writer's schema so all-None columns
+        # in this flush cannot produce a mismatched table
+        table = pa.Table.from_pylist(data, schema=writer.schema)
+        writer.write_table(table)
+        logging.info(f"Batch records saved: {len(data)}")
+        return writer
+    except Exception as e:
+        logging.error(f"Failed to save batch data to Parquet: {e}")
+        raise
+
+
+def save_batch_to_csv(data: List[Dict[str, Any]], writer, output_handle, fields) -> "csv.writer":
+    """
+    Append a processed batch to the CSV file through a long-lived csv.writer.
+
+    The column set is fixed and known up front, so the rows are projected
+    onto it directly — no DictWriter key scan per batch and no dependency
+    on the first batch's field order.
+
+    Args:
+        data (List[Dict[str, Any]]): Processed rows for this batch
+        writer: Existing csv.writer, or None on the first batch; the writer
+            is then created and the header row is written once
+        output_handle: Open file object for the output CSV
+        fields: Ordered column names for the output CSV
+
+    Returns:
+        csv.writer: The writer to reuse for subsequent batches
+    """
+    try:
+        if writer is None:
+            writer = csv.writer(output_handle)
+            writer.writerow(fields)
+        writer.writerows([row.get(f) for f in fields] for row in data)
+        logging.info(f"Batch records saved: {len(data)}")
+        return writer
+    except Exception as e:
+        logging.error(f"Failed to save batch data to CSV: {e}")
+        raise
+
+
+async def paginate_and_save(
+    endpoint: str,
+    processor: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+    output_file: str,
+    fields,
+    extra_params: Dict[str, str] = None,
+    label: str = None
+) -> int:
+    """
+    Fetch every page of an Alegra endpoint and stream the processed rows out.
+
+    The run is a three-stage pipeline connected by small bounded queues:
+    one coroutine fetches waves of CONCURRENCY pages, one flattens each raw
+    page via the processor in a worker thread, and one buffers rows and
+    writes them out every FLUSH_EVERY_PAGES pages. Network, CPU, and disk
+    work overlap, so wall time approaches the slowest single stage, while
+    the queue bounds keep only a few pages in flight.
+
+    Rows are written as Parquet when output_file ends in ".parquet",
+    otherwise as CSV.
+
+    Args:
+        endpoint (str): Alegra API endpoint path, e.g. "warehouse-transfers"
+        processor (Callable): process_*_data function turning one page of raw
+            records into flat row dicts for the CSV writer
+        output_file (str): Output filename; a ".parquet" suffix selects
+            Parquet, anything else writes CSV
+        fields: Ordered column names the processor's rows are projected
+            onto in the CSV output
+        extra_params (Dict[str, str], optional): Query parameters added to
+            every page request, e.g. {"order_direction": "ASC"}
+        label (str, optional): Human-readable record name for log messages;
+            defaults to the endpoint path
+
+    Returns:
+        int: Total number of records fetched and written out
+
+    Raises:
+        aiohttp.ClientError: If an API request fails
+        orjson.JSONDecodeError: If a response is not valid JSON
+    """
+    label = label or endpoint
+    total_fetched = 0
+    csv_writer = None
+    parquet_writer = None
+    use_parquet = output_file.endswith(".parquet")
+    url = f"{API_BASE_URL}/{endpoint}"
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    loop = asyncio.get_running_loop()
+
+    # Bounded hand-off queues between the stages; None is the end-of-stream
+    # sentinel passed down the pipeline
+    raw_queue: asyncio.Queue = asyncio.Queue(maxsize=4)
+    processed_queue: asyncio.Queue = asyncio.Queue(maxsize=4)
+
+    async def _fetch_stage(session: aiohttp.ClientSession, cache) -> None:
+        """Fetch pages in waves and feed raw batches into raw_queue."""
+        nonlocal total_fetched
+        start = 0
+        done = False
+        while not done:
+            offsets = [start + i * BATCH_SIZE for i in range(CONCURRENCY)]
+            params_list = []
+            for offset in offsets:
+                params = {"start": str(offset)}
+                if extra_params:
+                    params.update(extra_params)
+                params_list.append(params)
+            logging.info(f"Fetching {label} for offsets {offsets[0]} to {offsets[-1]}")
+
+            try:
+                pages = await asyncio.gather(
+                    *[_fetch_page(session, semaphore, url, params, cache)
+                      for params in params_list]
+                )
+            except aiohttp.ClientError as e:
+                logging.error(f"API request failed at start={start}: {e}")
+                raise
+            except ValueError as e:
+                logging.error(f"Failed to parse JSON response at start={start}: {e}")
+                raise
+
+            # Consume the wave in offset order; stop at the first empty or
+            # partial page since that marks the end of the data
+            for batch_data in pages:
+                if not batch_data:
+                    logging.info(f"No more {label} to fetch")
+                    done = True
+                    break
+
+                # Raw pages are handed straight downstream, not accumulated,
+                # so peak memory stays at a few pages regardless of account size
+                total_fetched += len(batch_data)
+                await raw_queue.put(batch_data)
+                logging.info(f"Fetched {len(batch_data)} {label} in this batch")
+
+                # If we got fewer records than BATCH_SIZE, we've reached the end
+                if len(batch_data) < BATCH_SIZE:
+                    logging.info("Reached end of data (partial batch received)")
+                    done = True
+                    break
+
+            # Move to the next wave of pages
+            start += CONCURRENCY * BATCH_SIZE
+
+        await raw_queue.put(None)
+
+    async def _process_stage() -> None:
+        """Flatten raw batches in a worker thread, overlapping the fetches."""
+        while True:
+            batch_data = await raw_queue.get()
+            if batch_data is None:
+                await processed_queue.put(None)
+                break
+            rows = await loop.run_in_executor(None, processor, batch_data)
+            await processed_queue.put(rows)
+
+    async def _write_stage() -> None:
+        """Buffer processed rows and flush them every FLUSH_EVERY_PAGES pages."""
+        nonlocal csv_writer, parquet_writer
+        pending_rows = []
+        pending_batches = 0
+
+        async def _flush() -> None:
+            # Amortize the writer's fixed cost across many pages; the
+            # blocking write runs in a worker thread so the pipeline is
+            # not stalled
+            nonlocal csv_writer, parquet_writer
+            if use_parquet:
+                parquet_writer = await loop.run_in_executor(
+                    None, save_batch_to_parquet, pending_rows, parquet_writer, output_file
+                )
+            else:
+                csv_writer = await loop.run_in_executor(
+                    None, save_batch_to_csv, pending_rows, csv_writer, output_handle, fields
+                )
+
+        while True:
+            rows = await processed_queue.get()
+            if rows is None:
+                break
+            pending_rows.extend(rows)
+            pending_batches += 1
+            if pending_batches >= FLUSH_EVERY_PAGES and pending_rows:
+                await _flush()
+                pending_rows = []
+                pending_batches = 0
+
+        # Flush whatever is still buffered after the final partial wave
+        if pending_rows:
+            await _flush()
+
+    cache = shelve.open(CACHE_FILE) if USE_CACHE else None
+    # Open the output file once for the whole run with a 1 MiB write buffer;
+    # each batch is appended through the same handle instead of reopening
+    # (and flushing) the file per page. For Parquet the writer is created
+    # lazily from the first flushed batch's schema.
+    output_handle = None
+    if not use_parquet:
+        output_handle = open(output_file, 'w', buffering=1 << 20, newline='', encoding='utf-8')
+    try:
+        connector = aiohttp.TCPConnector(limit=CONCURRENCY, keepalive_timeout=60)
+        # The constant headers ride on the session, so each page request only
+        # carries its params dict
+        async with aiohttp.ClientSession(connector=connector, timeout=REQUEST_TIMEOUT, headers=HEADERS) as session:
+            stages = [
+                asyncio.create_task(_fetch_stage(session, cache)),
+                asyncio.create_task(_process_stage()),
+                asyncio.create_task(_write_stage()),
+            ]
+            try:
+                await asyncio.gather(*stages)
+            except BaseException:
+                # A failed stage would leave the others blocked on their
+                # queues; tear the whole pipeline down before re-raising
+                for stage in stages:
+                    stage.cancel()
+                raise
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+        if output_handle is not None:
+            output_handle.close()
+        if cache is not None:
+            cache.close()
+
+    logging.info(f"Total {label} fetched: {total_fetched}")
+    return total_fetched
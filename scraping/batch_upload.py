@@ -5,7 +5,7 @@ Uses configuration from config.py
 """
 
 import os
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from upload_csv_to_bigquery import BigQueryCSVUploader
 from config import (
     PROJECT_ID, DATASET_ID, CREDENTIALS_PATH, 
@@ -34,49 +34,62 @@ def batch_upload_csvs():
     
     success_count = 0
     total_files = 0
-    
-    # Process each CSV file
-    for csv_file, table_name in TABLE_MAPPING.items():
-        total_files += 1
-        
-        # Check if file exists
-        if not Path(csv_file).exists():
-            print(f"⚠️  Skipping {csv_file} - file not found")
-            continue
-        
-        # Construct table ID
-        table_id = f"{PROJECT_ID}.{DATASET_ID}.{table_name}"
-        
-        print(f"\n📂 Processing: {csv_file}")
-        print(f"   Target table: {table_id}")
-        
-        # Get file size for progress info
-        file_size = Path(csv_file).stat().st_size
-        print(f"   File size: {file_size:,} bytes")
-        
-        # Upload the file
-        try:
-            success = uploader.upload_csv_to_table(
+
+    # Verify (or create) the target dataset once for the whole batch instead
+    # of once per file inside upload_csv_to_table
+    uploader.create_dataset_if_not_exists(DATASET_ID)
+
+    # Submit each CSV file as a concurrent load job. BigQuery load jobs are
+    # I/O-bound and the client is thread-safe, so overlapping the uploads
+    # shrinks wall time to roughly the slowest single job. Cap the worker
+    # count to stay within BigQuery's concurrent load-job quota.
+    futures = {}
+    with ThreadPoolExecutor(max_workers=min(8, len(TABLE_MAPPING))) as executor:
+        for csv_file, table_name in TABLE_MAPPING.items():
+            total_files += 1
+
+            # One stat call covers both the existence check and the size log
+            try:
+                file_stat = os.stat(csv_file)
+            except FileNotFoundError:
+                print(f"⚠️  Skipping {csv_file} - file not found")
+                continue
+
+            # Construct table ID
+            table_id = f"{PROJECT_ID}.{DATASET_ID}.{table_name}"
+
+            print(f"\n📂 Submitting: {csv_file}")
+            print(f"   Target table: {table_id}")
+            print(f"   File size: {file_stat.st_size:,} bytes")
+
+            future = executor.submit(
+                uploader.upload_csv_to_table,
                 csv_file=csv_file,
                 table_id=table_id,
                 write_disposition=DEFAULT_WRITE_DISPOSITION,
-                auto_detect_schema=True
+                auto_detect_schema=True,
+                skip_dataset_check=True
             )
-            
-            if success:
-                success_count += 1
-                print(f"   ✅ Upload successful!")
-                
-                # Get updated table info
-                info = uploader.get_table_info(table_id)
-                if info:
-                    print(f"   📊 Rows: {info['num_rows']:,}")
-                    print(f"   💾 Size: {info['num_bytes']:,} bytes")
-            else:
-                print(f"   ❌ Upload failed!")
-                
-        except Exception as e:
-            print(f"   ❌ Upload failed with error: {e}")
+            futures[future] = (csv_file, table_id)
+
+        # Collect results as the load jobs finish. The upload result already
+        # carries the post-load row/byte counts, so no extra metadata RPC is
+        # needed per file.
+        for future in as_completed(futures):
+            csv_file, table_id = futures[future]
+            try:
+                result = future.result()
+
+                if result["success"]:
+                    success_count += 1
+                    print(f"\n✅ Upload successful: {csv_file}")
+                    print(f"   📊 Rows: {result['num_rows']:,}")
+                    print(f"   💾 Size: {result['num_bytes']:,} bytes")
+                else:
+                    print(f"\n❌ Upload failed: {csv_file}")
+
+            except Exception as e:
+                print(f"\n❌ Upload of {csv_file} failed with error: {e}")
     
     # Summary
     print("\n" + "=" * 50)
@@ -89,12 +102,14 @@ def batch_upload_csvs():
     if success_count > 0:
         print(f"\n🎉 Batch upload completed! {success_count} files uploaded successfully.")
         
-        # List final dataset contents
+        # List final dataset contents, fetching the per-table info
+        # concurrently instead of one sequential RPC per table
         print(f"\n📋 Tables in dataset '{DATASET_ID}':")
         tables = uploader.list_tables_in_dataset(DATASET_ID)
-        for table in tables:
-            table_id = f"{PROJECT_ID}.{DATASET_ID}.{table}"
-            info = uploader.get_table_info(table_id)
+        table_ids = [f"{PROJECT_ID}.{DATASET_ID}.{table}" for table in tables]
+        with ThreadPoolExecutor(max_workers=min(8, max(1, len(table_ids)))) as executor:
+            infos = executor.map(uploader.get_table_info, table_ids)
+        for table, info in zip(tables, infos):
             if info:
                 print(f"   • {table}: {info['num_rows']:,} rows")
     else:
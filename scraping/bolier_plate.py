@@ -1,6 +1,8 @@
 import os
 import requests
-import json
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 url = "https://api.alegra.com/api/v1/items"
 
@@ -13,14 +15,22 @@ headers = {
     "authorization": AUTHORIZATION_TOKEN
 }
 
-response = requests.get(url, headers=headers)
+# Reuse one pooled TLS connection and retry transient failures with backoff
+# instead of opening a fresh connection per request
+session = requests.Session()
+session.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=16,
+    max_retries=Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+))
 
-items = response.json()
+response = session.get(url, headers=headers)
+
+# Decode straight from the response bytes with orjson
+items = orjson.loads(response.content)
 
 # Save items to JSON file
-with open('items.json', 'w', encoding='utf-8') as f:
-    json.dump(items, f, indent=2, ensure_ascii=False)
+with open('items.json', 'wb') as f:
+    f.write(orjson.dumps(items, option=orjson.OPT_INDENT_2))
 
 print(f"Items saved to items.json")
-
-for item in items:
@@ -1,5 +1,8 @@
 import os
 import requests
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 url = "https://api.alegra.com/api/v1/purchase-orders?order_direction=ASC"
 
@@ -12,8 +15,18 @@ headers = {
     "authorization": AUTHORIZATION_TOKEN
 }
 
-response = requests.get(url, headers=headers)
-items = response.json()
+# Reuse one pooled TLS connection and retry transient failures with backoff
+# instead of opening a fresh connection per request
+session = requests.Session()
+session.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=16,
+    max_retries=Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+response = session.get(url, headers=headers)
+# Decode straight from the response bytes with orjson
+items = orjson.loads(response.content)
 
 for item in items:
     dict_ = { 
@@ -8,10 +8,14 @@ Author: Your Name
 Date: August 2025
 """
 
+import asyncio
 import os
-import requests
+import aiohttp
+import orjson
 import pandas as pd
-from typing import List, Dict, Any
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import List, Dict, Any, Optional
 import logging
 
 # Set up logging
@@ -20,78 +24,174 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Configuration constants
 API_BASE_URL = "https://api.alegra.com/api/v1"
 BATCH_SIZE = 30  # Number of records to fetch per request
+CONCURRENCY = 8  # Concurrent page requests; kept low to respect API rate limits
+MAX_RETRIES = 5  # Attempts per page for rate-limited or transient errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
 OUTPUT_FILE = "items_inventory.csv"
 
+# Flattened API field -> output CSV column
+_COLUMN_MAP = {
+    "inventory.initialQuantity": "initial_quantity",
+    "inventory.initialQuantityDate": "initial_quantity_date",
+    "inventory.availableQuantity": "final_available_quantity",
+}
+OUTPUT_COLUMNS = ["id", "name", "initial_quantity", "initial_quantity_date",
+                  "final_available_quantity", "photo_url"]
+
+# Fixed dtype per output column so every batch yields the same Arrow schema;
+# left to inference, an all-missing column (photo_url, the quantities) would
+# flip dtype between batches and ParquetWriter would reject the table
+_PARQUET_DTYPES = {
+    "id": "string",
+    "name": "string",
+    "initial_quantity": "float64",
+    "initial_quantity_date": "string",
+    "final_available_quantity": "float64",
+    "photo_url": "string",
+}
+
 # API credentials from environment variable
 AUTHORIZATION_TOKEN = os.getenv("KEY_ALEGRA")
 if not AUTHORIZATION_TOKEN:
     raise ValueError("KEY_ALEGRA environment variable is not set")
 
 
-def fetch_items_data() -> List[Dict[str, Any]]:
+async def _fetch_page(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    url: str,
+    headers: Dict[str, str],
+    start: int
+) -> List[Dict[str, Any]]:
+    """
+    Fetch a single page of items, limited by the shared semaphore.
+    
+    Args:
+        session (aiohttp.ClientSession): Shared HTTP session with pooled connections
+        semaphore (asyncio.Semaphore): Caps the number of in-flight requests
+        url (str): Items endpoint URL
+        headers (Dict[str, str]): Request headers including authorization
+        start (int): Pagination offset for this page
+        
+    Returns:
+        List[Dict[str, Any]]: Raw items returned for this page
+    """
+    async with semaphore:
+        for attempt in range(MAX_RETRIES):
+            async with session.get(url, headers=headers, params={"start": str(start)}) as response:
+                if response.status in RETRY_STATUS_CODES and attempt < MAX_RETRIES - 1:
+                    # Back off exponentially on rate limits and transient
+                    # server errors, reusing the pooled connection
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+                    continue
+                response.raise_for_status()
+                # orjson parses the raw bytes directly, skipping aiohttp's
+                # charset handling and the slower stdlib json decoder
+                return orjson.loads(await response.read())
+
+
+async def fetch_items_data() -> List[Dict[str, Any]]:
     """
-    Fetch all items data from Alegra API using pagination.
+    Fetch all items data from Alegra API using concurrent paginated requests.
+    
+    Pages are requested in waves of CONCURRENCY via aiohttp and processed in
+    offset order, so the output file keeps the same ordering as the
+    sequential version while the HTTP round-trips overlap.
+    
+    Batches are written as Parquet when OUTPUT_FILE ends in ".parquet",
+    otherwise as CSV.
     
     Returns:
         List[Dict[str, Any]]: List of all items from the API
         
     Raises:
-        requests.RequestException: If the API request fails
-        ValueError: If the response is not valid JSON
+        aiohttp.ClientError: If an API request fails
+        orjson.JSONDecodeError: If a response is not valid JSON
     """
     all_items = []
     start = 0
+    is_first_batch = True
+    done = False
+    url = f"{API_BASE_URL}/items"
+    headers = {
+        "accept": "application/json",
+        "authorization": AUTHORIZATION_TOKEN
+    }
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    loop = asyncio.get_running_loop()
+    use_parquet = OUTPUT_FILE.endswith(".parquet")
+    parquet_writer = None
     
-    while True:
-        url = f"{API_BASE_URL}/items"
-        headers = {
-            "accept": "application/json",
-            "authorization": AUTHORIZATION_TOKEN
-        }
-        params = {"start": start}
-        
-        logging.info(f"Fetching items starting from position: {start}")
-        
-        try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()  # Raises an HTTPError for bad responses
-            
-            batch_data = response.json()
-            
-            # If no more data, break the loop
-            if not batch_data or len(batch_data) == 0:
-                logging.info("No more items to fetch")
-                break
+    # Open the output file once for the whole run with a 1 MiB write buffer;
+    # each batch is appended through the same handle instead of reopening the
+    # file (and flushing) per page. For Parquet the writer is created lazily
+    # from the first batch's schema.
+    try:
+        output_handle = None
+        if not use_parquet:
+            output_handle = open(OUTPUT_FILE, 'w', buffering=1 << 20, newline='', encoding='utf-8')
+        connector = aiohttp.TCPConnector(limit=CONCURRENCY, keepalive_timeout=60)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            while not done:
+                offsets = [start + i * BATCH_SIZE for i in range(CONCURRENCY)]
+                logging.info(f"Fetching items for offsets {offsets[0]} to {offsets[-1]}")
+                
+                try:
+                    pages = await asyncio.gather(
+                        *[_fetch_page(session, semaphore, url, headers, offset) for offset in offsets]
+                    )
+                except aiohttp.ClientError as e:
+                    logging.error(f"API request failed at start={start}: {e}")
+                    raise
+                except ValueError as e:
+                    logging.error(f"Failed to parse JSON response at start={start}: {e}")
+                    raise
                 
-            all_items.extend(batch_data)
-
-            # Process and save this batch immediately
-            processed_batch = process_items_data(batch_data)
-            if processed_batch:
-                save_batch_to_csv(processed_batch, OUTPUT_FILE, start == 0)
-            
-            logging.info(f"Fetched and saved {len(batch_data)} items in this batch")
-            
-            # If we got fewer records than BATCH_SIZE, we've reached the end
-            if len(batch_data) < BATCH_SIZE:
-                logging.info("Reached end of data (partial batch received)")
-                break
+                # Consume the wave in offset order; stop at the first empty or
+                # partial page since that marks the end of the data
+                for batch_data in pages:
+                    if not batch_data:
+                        logging.info("No more items to fetch")
+                        done = True
+                        break
+                        
+                    all_items.extend(batch_data)
+
+                    # Process and save this batch immediately; the blocking CSV
+                    # write runs in a worker thread so fetching is not stalled
+                    processed_batch = process_items_data(batch_data)
+                    if not processed_batch.empty:
+                        if use_parquet:
+                            parquet_writer = await loop.run_in_executor(
+                                None, save_batch_to_parquet, processed_batch, parquet_writer, OUTPUT_FILE
+                            )
+                        else:
+                            await loop.run_in_executor(
+                                None, save_batch_to_csv, processed_batch, output_handle, is_first_batch
+                            )
+                            is_first_batch = False
+                    
+                    logging.info(f"Fetched and saved {len(batch_data)} items in this batch")
+                    
+                    # If we got fewer records than BATCH_SIZE, we've reached the end
+                    if len(batch_data) < BATCH_SIZE:
+                        logging.info("Reached end of data (partial batch received)")
+                        done = True
+                        break
                 
-            # Move to next batch
-            start += BATCH_SIZE
-            
-        except requests.RequestException as e:
-            logging.error(f"API request failed at start={start}: {e}")
-            raise
-        except ValueError as e:
-            logging.error(f"Failed to parse JSON response at start={start}: {e}")
-            raise
+                # Move to the next wave of pages
+                start += CONCURRENCY * BATCH_SIZE
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+        if output_handle is not None:
+            output_handle.close()
     
     logging.info(f"Total items fetched: {len(all_items)}")
     return all_items
 
 
-def process_items_data(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def process_items_data(items: List[Dict[str, Any]]) -> pd.DataFrame:
     """
     Process raw items data and extract relevant information.
     
@@ -99,50 +199,20 @@ def process_items_data(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         items (List[Dict[str, Any]]): List of raw items data from API
         
     Returns:
-        List[Dict[str, Any]]: List of processed items with normalized structure
+        pd.DataFrame: Processed items with one column per output CSV field
     """
-    processed_items = []
-    
     logging.info(f"Processing {len(items)} items")
     
-    for item in items:
-        # Extract item-level information with individual field error handling
-        item_data = {}
-        
-        # Handle each field individually, setting to null if error occurs
-        try:
-            item_data["id"] = item["id"]
-        except (KeyError, TypeError):
-            item_data["id"] = None
-            
-        try:
-            item_data["name"] = item["name"]
-        except (KeyError, TypeError):
-            item_data["name"] = None
-            
-        try:
-            item_data["initial_quantity"] = item["inventory"]["initialQuantity"]
-        except (KeyError, TypeError):
-            item_data["initial_quantity"] = None
-            
-        try:
-            item_data["initial_quantity_date"] = item["inventory"]["initialQuantityDate"]
-        except (KeyError, TypeError):
-            item_data["initial_quantity_date"] = None
-            
-        try:
-            item_data["final_available_quantity"] = item["inventory"]["availableQuantity"]
-        except (KeyError, TypeError):
-            item_data["final_available_quantity"] = None
-            
-        try:
-            item_data["photo_url"] = item["images"][0]["url"]
-        except (KeyError, TypeError, IndexError):
-            item_data["photo_url"] = None
-        processed_items.append(item_data)
+    # json_normalize flattens the nested inventory fields in C instead of a
+    # per-item Python loop; reindex pins the column set so batches missing a
+    # field still line up with the CSV header
+    df = pd.json_normalize(items).rename(columns=_COLUMN_MAP)
+    if "images" in df.columns:
+        df["photo_url"] = df["images"].str[0].str.get("url")
+    df = df.reindex(columns=OUTPUT_COLUMNS)
     
-    logging.info(f"Successfully processed {len(processed_items)} items")
-    return processed_items
+    logging.info(f"Successfully processed {len(df)} items")
+    return df
 
 
 def save_to_csv(data: List[Dict[str, Any]], filename: str) -> None:
@@ -163,35 +233,57 @@ def save_to_csv(data: List[Dict[str, Any]], filename: str) -> None:
         raise
 
 
-def save_batch_to_csv(data: List[Dict[str, Any]], filename: str, is_first_batch: bool = False) -> None:
+def save_batch_to_csv(data: pd.DataFrame, output_handle, is_first_batch: bool = False) -> None:
     """
-    Save processed batch data to CSV file, appending to existing file or creating new one.
+    Append a processed batch to the CSV file through the already-open handle.
     
     Args:
-        data (List[Dict[str, Any]]): List of processed invoice items for this batch
-        filename (str): Output CSV filename
-        is_first_batch (bool): If True, create new file with headers; if False, append without headers
+        data (pd.DataFrame): Processed items for this batch
+        output_handle: Open file object for the output CSV
+        is_first_batch (bool): If True, write the header row before the data
     """
     try:
-        df = pd.DataFrame(data)
-        mode = 'w' if is_first_batch else 'a'
-        header = is_first_batch
-        df.to_csv(filename, mode=mode, header=header, index=False)
-        logging.info(f"Batch data ({'with' if header else 'without'} headers) appended to {filename}")
-        logging.info(f"Batch records saved: {len(df)}")
+        data.to_csv(output_handle, header=is_first_batch, index=False)
+        logging.info(f"Batch records saved: {len(data)}")
     except Exception as e:
         logging.error(f"Failed to save batch data to CSV: {e}")
         raise
 
 
+def save_batch_to_parquet(data: pd.DataFrame, writer: Optional[pq.ParquetWriter], filename: str) -> pq.ParquetWriter:
+    """
+    Append a processed batch to a Parquet file through a long-lived writer.
+    
+    Args:
+        data (pd.DataFrame): Processed items for this batch
+        writer (Optional[pq.ParquetWriter]): Existing writer, or None on the
+            first batch; the writer is then created from this batch's schema
+        filename (str): Output Parquet filename
+        
+    Returns:
+        pq.ParquetWriter: The writer to reuse for subsequent batches; the
+        caller is responsible for closing it after the last batch
+    """
+    try:
+        table = pa.Table.from_pandas(data.astype(_PARQUET_DTYPES), preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(filename, table.schema, compression="snappy")
+        writer.write_table(table)
+        logging.info(f"Batch records saved: {len(data)}")
+        return writer
+    except Exception as e:
+        logging.error(f"Failed to save batch data to Parquet: {e}")
+        raise
+
+
 def main():
     """
     Main function to orchestrate the items data extraction process.
     """
     try:
-        # Fetch all items data from API using pagination
+        # Fetch all items data from API using concurrent pagination
         # Data is processed and saved incrementally as each batch is fetched
-        items_data = fetch_items_data()
+        items_data = asyncio.run(fetch_items_data())
      
         # At this point, all data has already been processed and saved batch by batch
         logging.info("All items data has been processed and saved incrementally")
@@ -91,6 +91,12 @@ def fetch_items_data() -> List[Dict[str, Any]]:
     return all_items
 
 
+def _last_warehouse(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the last listed warehouse of an item, or an empty dict."""
+    warehouses = (item.get("inventory") or {}).get("warehouses") or [{}]
+    return warehouses[-1] or {}
+
+
 def process_items_data(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Process raw items data and extract relevant information.
@@ -101,48 +107,23 @@ def process_items_data(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     Returns:
         List[Dict[str, Any]]: List of processed items with normalized structure
     """
-    processed_items = []
-    
     logging.info(f"Processing {len(items)} items")
     
+    # Missing fields fall back to None through chained dict.get calls, which
+    # is far cheaper than raising and catching a KeyError per field. As
+    # before, each item keeps the values of its last listed warehouse.
+    processed_items = []
     for item in items:
-        # Extract item-level information with individual field error handling
-        item_data = {}
-        
-        # Handle each field individually, setting to null if error occurs
-        try:
-            item_data["id"] = item["id"]
-        except (KeyError, TypeError):
-            item_data["id"] = None
-            
-        try:
-            item_data["name"] = item["name"]
-        except (KeyError, TypeError):
-            item_data["name"] = None
-
-        try:
-            inventory_data = item['inventory']
-            warehouses = inventory_data['warehouses']
-            for warehouse in warehouses:
-                try:
-                    item_data['warehouse'] = warehouse['name']
-                except (KeyError, TypeError):
-                    item_data['warehouse'] = None
-                try:
-                    item_data['initialQuantity'] = warehouse['initialQuantity']
-                except (KeyError, TypeError):
-                    item_data['initialQuantity'] = None
-                try:
-                    item_data['availableQuantity'] = warehouse['availableQuantity']
-                except (KeyError, TypeError):
-                    item_data['availableQuantity'] = None
-        except (KeyError, TypeError):
-            item_data['warehouse'] = None
-            item_data['initialQuantity'] = None
-            item_data['availableQuantity'] = None
-
-        processed_items.append(item_data)
-    logging.info(f"Successfully processed {len(processed_items)} items")    return processed_items
+        warehouse = _last_warehouse(item)
+        processed_items.append({
+            "id": item.get("id"),
+            "name": item.get("name"),
+            "warehouse": warehouse.get("name"),
+            "initialQuantity": warehouse.get("initialQuantity"),
+            "availableQuantity": warehouse.get("availableQuantity"),
+        })
+    
+    logging.info(f"Successfully processed {len(processed_items)} items")
     return processed_items
 
 
@@ -6,6 +6,7 @@ This script demonstrates how to use the BigQueryCSVUploader class
 to upload the warehouse movements CSV file to BigQuery.
 """
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from upload_csv_to_bigquery import BigQueryCSVUploader
 import os
 
@@ -48,42 +49,55 @@ def main():
         }
     ]
     
-    # Upload each CSV file
-    for upload_config in csv_uploads:
-        csv_file = upload_config["csv_file"]
-        table_name = upload_config["table_name"]
-        write_disposition = upload_config["write_disposition"]
-        
-        # Check if file exists
-        if not os.path.exists(csv_file):
-            print(f"Skipping {csv_file} - file not found")
-            continue
-        
-        # Construct full table ID
-        table_id = f"{PROJECT_ID}.{DATASET_ID}.{table_name}"
-        
-        print(f"\n{'='*50}")
-        print(f"Uploading {csv_file} to {table_id}")
-        print(f"{'='*50}")
-        
-        # Upload the CSV
-        success = uploader.upload_csv_to_table(
-            csv_file=csv_file,
-            table_id=table_id,
-            write_disposition=write_disposition,
-            auto_detect_schema=True
-        )
-        
-        if success:
-            print(f"✅ Successfully uploaded {csv_file}")
-            
-            # Show table information
-            info = uploader.get_table_info(table_id)
-            if info:
-                print(f"   📊 Table now contains {info['num_rows']:,} rows")
-                print(f"   💾 Size: {info['num_bytes']:,} bytes")
-        else:
-            print(f"❌ Failed to upload {csv_file}")
+    # Submit each upload as a concurrent load job: the four files are
+    # independent and the jobs are network-bound, so running them in a small
+    # thread pool cuts wall time to roughly the slowest single upload
+    futures = {}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for upload_config in csv_uploads:
+            csv_file = upload_config["csv_file"]
+            table_name = upload_config["table_name"]
+            write_disposition = upload_config["write_disposition"]
+
+            # Prefer the Parquet twin when the downloader produced one: it is
+            # much smaller on disk and BigQuery loads it without schema sniffing
+            parquet_file = os.path.splitext(csv_file)[0] + ".parquet"
+            if os.path.exists(parquet_file):
+                csv_file = parquet_file
+
+            # Check if file exists
+            if not os.path.exists(csv_file):
+                print(f"Skipping {csv_file} - file not found")
+                continue
+
+            # Construct full table ID
+            table_id = f"{PROJECT_ID}.{DATASET_ID}.{table_name}"
+
+            print(f"Submitting upload of {csv_file} to {table_id}")
+            future = executor.submit(
+                uploader.upload_csv_to_table,
+                csv_file=csv_file,
+                table_id=table_id,
+                write_disposition=write_disposition,
+                auto_detect_schema=True
+            )
+            futures[future] = csv_file
+
+        # Report results as the load jobs finish
+        for future in as_completed(futures):
+            csv_file = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ Upload of {csv_file} failed with error: {e}")
+                continue
+
+            if result["success"]:
+                print(f"✅ Successfully uploaded {csv_file}")
+                print(f"   📊 Table now contains {result['num_rows']:,} rows")
+                print(f"   💾 Size: {result['num_bytes']:,} bytes")
+            else:
+                print(f"❌ Failed to upload {csv_file}")
     
     # List all tables in the dataset
     print(f"\n{'='*50}")